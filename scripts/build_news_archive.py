@@ -27,10 +27,22 @@ Após o processamento, os arquivos `data/archive/promo_filtered_*.json` são apa
 """
 
 import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from functools import lru_cache
+from itertools import chain
+from operator import itemgetter
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+try:
+    import orjson  # Opcional: encode/decode de JSON bem mais rápido
+except ImportError:  # pragma: no cover
+    orjson = None
+
 # Caminhos base
 BASE_DIR = Path(__file__).resolve().parents[1]
 DATA_DIR = BASE_DIR / "data"
@@ -49,6 +61,8 @@ PROMO_MONTHLY_DIR = PROMO_DIR / "monthly"
 def load_json_any(path: Path) -> Any:
     if not path.exists():
         return None
+    if orjson is not None:
+        return orjson.loads(path.read_bytes())
     with path.open("r", encoding="utf-8") as f:
         return json.load(f)
 
@@ -88,9 +102,31 @@ def load_json_list(path: Path, root_key: Optional[str] = None) -> List[Dict[str,
 
 
 def save_json_list(path: Path, items: List[Dict[str, Any]]) -> None:
+    """
+    Grava a lista de forma atômica: escreve em `<arquivo>.tmp` e faz
+    os.replace, para nunca deixar um JSON pela metade se o job cair.
+    """
     path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as f:
-        json.dump(items, f, ensure_ascii=False, indent=2)
+    tmp_path = path.with_name(path.name + ".tmp")
+    if orjson is not None:
+        # Mesmo layout do json.dump(indent=2, ensure_ascii=False), direto em bytes
+        tmp_path.write_bytes(orjson.dumps(items, option=orjson.OPT_INDENT_2))
+    else:
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(items, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def save_json_lists(jobs: Dict[Path, List[Dict[str, Any]]]) -> None:
+    """
+    Grava vários arquivos de uma vez, sobrepondo serialização e I/O
+    em um pool de threads.
+    """
+    if not jobs:
+        return
+    with ThreadPoolExecutor(max_workers=min(len(jobs), 8)) as executor:
+        # list() propaga exceções de qualquer gravação
+        list(executor.map(lambda job: save_json_list(*job), jobs.items()))
 
 
 # ---------- Helpers para datas ----------
@@ -107,18 +143,32 @@ def parse_datetime(value: Any) -> Optional[datetime]:
         return datetime.fromtimestamp(float(value), tz=timezone.utc)
 
     if isinstance(value, str):
-        # tenta ISO 8601
-        try:
-            # datetime.fromisoformat pode não entender 'Z', então tratamos
-            if value.endswith("Z"):
-                value = value[:-1] + "+00:00"
-            return datetime.fromisoformat(value)
-        except Exception:
-            return None
+        return _parse_iso_datetime(value)
 
     return None
 
 
+_ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+@lru_cache(maxsize=None)
+def _parse_iso_datetime(value: str) -> Optional[datetime]:
+    """
+    Parse ISO 8601 memoizado pela string: o mesmo item passa pelo merge
+    mensal e pelo anual, então cada `published` é convertido uma vez só.
+    """
+    # Rejeita sem try/except o que nem começa como data ISO (ex.: RFC 822)
+    if not _ISO_DATE_RE.match(value):
+        return None
+    try:
+        # datetime.fromisoformat pode não entender 'Z', então tratamos
+        if value.endswith("Z"):
+            value = value[:-1] + "+00:00"
+        return datetime.fromisoformat(value)
+    except Exception:
+        return None
+
+
 def ensure_timestamp(item: Dict[str, Any]) -> float:
     """
     Garante que cada item tenha um campo numérico 'published_ts' (epoch em segundos)
@@ -139,69 +189,66 @@ def ensure_timestamp(item: Dict[str, Any]) -> float:
 
 # ---------- Bucketização por mês/ano ----------
 
-def bucket_items_by_month(items: List[Dict[str, Any]]) -> Dict[Tuple[int, int], List[Dict[str, Any]]]:
+def bucket_items(
+    items: List[Dict[str, Any]],
+) -> Tuple[Dict[Tuple[int, int], List[Dict[str, Any]]], Dict[int, List[Dict[str, Any]]]]:
     """
-    Agrupa itens por (ano, mês) com base em published_ts / published.
+    Agrupa itens por (ano, mês) e por ano numa única passada,
+    com base em published_ts / published.
     """
-    buckets: Dict[Tuple[int, int], List[Dict[str, Any]]] = {}
+    monthly: Dict[Tuple[int, int], List[Dict[str, Any]]] = {}
+    yearly: Dict[int, List[Dict[str, Any]]] = {}
 
     for it in items:
-        ts = ensure_timestamp(it)
-        dt = datetime.fromtimestamp(ts, tz=timezone.utc)
-        key = (dt.year, dt.month)
-        buckets.setdefault(key, []).append(it)
+        tm = time.gmtime(ensure_timestamp(it))
+        monthly.setdefault((tm.tm_year, tm.tm_mon), []).append(it)
+        yearly.setdefault(tm.tm_year, []).append(it)
 
-    return buckets
+    return monthly, yearly
 
 
-def bucket_items_by_year(items: List[Dict[str, Any]]) -> Dict[int, List[Dict[str, Any]]]:
+# ---------- Merge + dedup por link ----------
+
+def _dedup_key(item: Dict[str, Any]) -> str:
     """
-    Agrupa itens por ano.
+    Chave de dedup como uma única str (sem alocar tupla por item).
+    O fallback começa com \x00, que nunca aparece em um link.
     """
-    buckets: Dict[int, List[Dict[str, Any]]] = {}
-
-    for it in items:
-        ts = ensure_timestamp(it)
-        dt = datetime.fromtimestamp(ts, tz=timezone.utc)
-        key = dt.year
-        buckets.setdefault(key, []).append(it)
+    link = item.get("link")
+    if link:
+        return link
+    return f"\x00{item.get('title') or ''}\x00{item.get('source') or ''}"
 
-    return buckets
-
-
-# ---------- Merge + dedup por link ----------
 
 def merge_and_dedup(existing: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Junta listas existente + nova, deduplicando principalmente por `link`.
     Se não tiver link, tenta (title, source) como fallback.
+    Em caso de colisão, o item de `new` vence (é inserido depois).
     """
-    merged: Dict[Any, Dict[str, Any]] = {}
-
-    def key_for(item: Dict[str, Any]) -> Any:
-        link = item.get("link")
-        if link:
-            return ("link", link)
-        return ("title_source", item.get("title"), item.get("source"))
-
-    for item in existing + new:
-        k = key_for(item)
-        merged[k] = item
-
-    # Converte de volta para lista e ordena por published_ts desc
-    result = list(merged.values())
+    merged: Dict[str, Dict[str, Any]] = {}
 
-    def sort_key(it: Dict[str, Any]) -> float:
-        dt = parse_datetime(it.get("published")) or parse_datetime(it.get("updated"))
-        if dt is not None:
-            return dt.timestamp()
-        ts = it.get("published_ts")
-        if isinstance(ts, (int, float)):
-            return float(ts)
-        return 0.0
+    # chain evita a cópia O(N+M) de `existing + new`
+    for item in chain(existing, new):
+        merged[_dedup_key(item)] = item
+
+    # Normaliza published_ts uma vez por item (derivando de published/updated
+    # quando faltar) para ordenar com itemgetter, sem chamar Python por item.
+    # Itens sem data nenhuma vão para o fim, como antes.
+    dated: List[Dict[str, Any]] = []
+    undated: List[Dict[str, Any]] = []
+    for it in merged.values():
+        if not isinstance(it.get("published_ts"), (int, float)):
+            dt = parse_datetime(it.get("published")) or parse_datetime(it.get("updated"))
+            if dt is None:
+                undated.append(it)
+                continue
+            it["published_ts"] = dt.timestamp()
+        dated.append(it)
 
-    result.sort(key=sort_key, reverse=True)
-    return result
+    dated.sort(key=itemgetter("published_ts"), reverse=True)
+    dated.extend(undated)
+    return dated
 
 
 # ---------- Processamento de promo_filtered_* (feeds com conteúdo promocional) ----------
@@ -423,8 +470,11 @@ def main() -> None:
         return
 
     # Buckets por mês e ano
-    monthly_buckets = bucket_items_by_month(recent_items)
-    yearly_buckets = bucket_items_by_year(recent_items)
+    monthly_buckets, yearly_buckets = bucket_items(recent_items)
+
+    # Calcula todos os merges primeiro e grava tudo junto no final
+    jobs: Dict[Path, List[Dict[str, Any]]] = {}
+    messages: List[str] = []
 
     # --------- Atualiza arquivos mensais ---------
     for (year, month), items in sorted(monthly_buckets.items()):
@@ -436,9 +486,13 @@ def main() -> None:
 
         existing = load_json_list(month_path)
         merged = merge_and_dedup(existing, items)
-        save_json_list(month_path, merged)
+        if merged == existing:
+            # Nada novo: evita reserializar/regravar (e recommitar) o arquivo
+            messages.append(f"[INFO] Arquivo mensal sem alterações: {month_path}")
+            continue
+        jobs[month_path] = merged
 
-        print(
+        messages.append(
             f"[INFO] Arquivo mensal atualizado: {month_path} "
             f"(+{len(items)} itens, total {len(merged)})"
         )
@@ -450,13 +504,21 @@ def main() -> None:
 
         existing = load_json_list(year_path)
         merged = merge_and_dedup(existing, items)
-        save_json_list(year_path, merged)
+        if merged == existing:
+            # Nada novo: evita reserializar/regravar (e recommitar) o arquivo
+            messages.append(f"[INFO] Arquivo anual sem alterações: {year_path}")
+            continue
+        jobs[year_path] = merged
 
-        print(
+        messages.append(
             f"[INFO] Arquivo anual atualizado: {year_path} "
             f"(+{len(items)} itens, total {len(merged)})"
         )
 
+    save_json_lists(jobs)
+    for msg in messages:
+        print(msg)
+
     # --------- Processa arquivos promo_filtered_* ---------
     process_promo_filtered_files()
 
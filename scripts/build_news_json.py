@@ -23,7 +23,9 @@ import html
 import re
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from operator import itemgetter
 from typing import Iterable, List, Optional, Tuple
 
 from email.utils import parsedate_to_datetime
@@ -31,9 +33,19 @@ from email.utils import parsedate_to_datetime
 import feedparser
 
 try:
-    from bs4 import BeautifulSoup  # Optional, nicer HTML cleanup
+    from lxml import etree as ET  # Optional, libxml2-backed OPML parsing
 except ImportError:  # pragma: no cover
-    BeautifulSoup = None
+    import xml.etree.ElementTree as ET
+
+try:
+    import ahocorasick  # Optional, single-pass smart group matching
+except ImportError:  # pragma: no cover
+    ahocorasick = None
+
+try:
+    import orjson  # Optional, faster JSON encode/decode
+except ImportError:  # pragma: no cover
+    orjson = None
 
 # -------------------------------
 # Configuration
@@ -44,6 +56,7 @@ OUTPUT_PATH = BASE_DIR / "data" / "news_recent.json"
 ARCHIVE_DIR = BASE_DIR / "data" / "archive"
 
 DAYS_BACK = int(os.environ.get("DAYS_BACK", "30"))
+FETCH_WORKERS = max(1, int(os.environ.get("FETCH_WORKERS", "32")))
 
 # Map OPML group titles to internal type slugs
 CATEGORY_SLUGS = {
@@ -272,6 +285,40 @@ SMART_GROUP_RULES: List[Tuple[str, List[str]]] = [
     ]),
 ]
 
+# Keywords já em minúsculas: o texto é baixado uma vez por item e as
+# keywords uma vez só, no import (nada de kw.lower() dentro do loop)
+CURATED_KEYWORDS_LC: Tuple[str, ...] = tuple(kw.lower() for kw in CURATED_KEYWORDS)
+SMART_GROUP_RULES_LC: List[Tuple[str, Tuple[str, ...]]] = [
+    (label, tuple(kw.lower() for kw in keywords))
+    for label, keywords in SMART_GROUP_RULES
+]
+
+
+def build_smart_group_automaton():
+    """
+    Monta um único autômato Aho-Corasick com todas as keywords de
+    SMART_GROUP_RULES. Cada keyword aponta para os índices das regras
+    em que aparece (uma keyword pode pertencer a mais de um grupo).
+
+    Retorna None se pyahocorasick não estiver instalado.
+    """
+    if ahocorasick is None:
+        return None
+
+    rules_by_keyword: dict[str, set] = {}
+    for idx, (_label, keywords) in enumerate(SMART_GROUP_RULES_LC):
+        for kw in keywords:
+            rules_by_keyword.setdefault(kw, set()).add(idx)
+
+    automaton = ahocorasick.Automaton()
+    for kw, rule_idxs in rules_by_keyword.items():
+        automaton.add_word(kw, tuple(sorted(rule_idxs)))
+    automaton.make_automaton()
+    return automaton
+
+
+SMART_GROUP_AUTOMATON = build_smart_group_automaton()
+
 # -------------------------------
 # Promotional / commercial content filtering (ultra-conservador)
 # -------------------------------
@@ -332,13 +379,32 @@ def is_promotional_entry(title: str, summary_raw: str) -> bool:
 # -------------------------------
 # Helpers
 # -------------------------------
+# Regexes compiladas uma vez só (limpeza de HTML e slugify)
+_TAG_RE = re.compile(r"<[^>]+>")
+_WS_RE = re.compile(r"\s+")
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+
+
 def slugify(label: str) -> str:
     text = label.lower()
-    text = re.sub(r"[^a-z0-9]+", "-", text)
+    text = _SLUG_RE.sub("-", text)
     text = text.strip("-")
     return text or "unknown"
 
 
+def load_json(path: Path):
+    if orjson is not None:
+        return orjson.loads(path.read_bytes())
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def write_json(path: Path, data) -> None:
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+
 def normalize_category(group_title: str) -> Tuple[str, str]:
     label = (group_title or "General").strip()
     slug = CATEGORY_SLUGS.get(label)
@@ -350,23 +416,19 @@ def normalize_category(group_title: str) -> Tuple[str, str]:
 def clean_html_summary(raw: str) -> str:
     if not raw:
         return ""
+    # Texto puro (sem tags nem entidades): só normaliza espaços
+    if "<" not in raw and "&" not in raw:
+        return " ".join(raw.split())
     raw = html.unescape(raw)
-
-    if BeautifulSoup is not None:
-        soup = BeautifulSoup(raw, "html.parser")
-        text = soup.get_text(separator=" ", strip=True)
-    else:
-        text = re.sub(r"<[^>]+>", " ", raw)
-        text = re.sub(r"\s+", " ", text).strip()
-
-    return text
+    text = _TAG_RE.sub(" ", raw)
+    return _WS_RE.sub(" ", text).strip()
 
 
 def parse_published(entry) -> Optional[datetime]:
     """Return a timezone-aware datetime for a feed entry.
 
     - Tries feedparser's *_parsed fields first
-    - Falls back to common date fields using parsedate_to_datetime
+    - Falls back to common date fields (RFC 822, then ISO 8601)
     - If no timezone is present, assumes UTC
     """
     dt_struct = getattr(entry, "published_parsed", None) or getattr(
@@ -398,43 +460,87 @@ def parse_published(entry) -> Optional[datetime]:
         if not value:
             continue
 
-        try:
-            dt = parsedate_to_datetime(str(value))
-        except (TypeError, ValueError):
-            continue
-
+        dt = _parse_date_string(str(value))
         if dt is None:
             continue
 
-        if dt.tzinfo is None:
-            dt = dt.replace(tzinfo=timezone.utc)
-
         return dt
 
     return None
 
 
+@lru_cache(maxsize=4096)
+def _parse_date_string(value: str) -> Optional[datetime]:
+    """Parse a raw feed date string into an aware datetime (or None).
+
+    - RFC 822 (the RSS format) via parsedate_to_datetime
+    - Then ISO 8601 (Atom / dc:date) via datetime.fromisoformat
+    - Cached: feeds are re-fetched every run with the same date strings
+    """
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        dt = None
+
+    if dt is None:
+        iso = value.strip()
+        if iso.endswith("Z"):
+            iso = iso[:-1] + "+00:00"
+        try:
+            dt = datetime.fromisoformat(iso)
+        except ValueError:
+            return None
+
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+
+    return dt
+
+
 def compute_smart_groups(title: str, summary: str) -> List[str]:
     text = f"{title or ''} {summary or ''}".lower()
-    groups: List[str] = []
 
-    for label, keywords in SMART_GROUP_RULES:
+    if SMART_GROUP_AUTOMATON is not None:
+        # Uma única passada sobre o texto; para assim que todas as regras batem
+        matched: set = set()
+        for _, rule_idxs in SMART_GROUP_AUTOMATON.iter(text):
+            matched.update(rule_idxs)
+            if len(matched) == len(SMART_GROUP_RULES):
+                break
+        # Mantém a ordem de SMART_GROUP_RULES (e dedup por label)
+        return list(dict.fromkeys(SMART_GROUP_RULES[i][0] for i in sorted(matched)))
+
+    # Dedup na mesma passada: label já visto não precisa ser testado de novo
+    seen = set()
+    groups: List[str] = []
+    for label, keywords in SMART_GROUP_RULES_LC:
+        if label in seen:
+            continue
         for kw in keywords:
-            if kw.lower() in text:
+            if kw in text:
+                seen.add(label)
                 groups.append(label)
                 break
+    return groups
 
-    seen = set()
-    deduped: List[str] = []
-    for g in groups:
-        if g not in seen:
-            seen.add(g)
-            deduped.append(g)
-    return deduped
+
+def fetch_feed(xml_url: str):
+    """
+    Baixa e faz parse de um feed. Roda nas threads do executor, por isso
+    não mexe em estado compartilhado: devolve (parsed, None) ou (None, exc).
+    """
+    try:
+        return feedparser.parse(xml_url), None
+    except Exception as e:
+        return None, e
 
 
-def iter_opml_feeds(opml_path: Path) -> Iterable[Tuple[str, str, str]]:
-    tree = ET.parse(opml_path)
+def iter_opml_feeds(opml_path: Path) -> Iterable[Tuple[str, str, str, str]]:
+    """
+    Percorre o OPML e gera (type_slug, type_label, feed_title, xml_url).
+    A categoria é resolvida uma vez por grupo, não uma vez por feed.
+    """
+    tree = ET.parse(str(opml_path))
     root = tree.getroot()
     body = root.find("body")
     if body is None:
@@ -442,12 +548,13 @@ def iter_opml_feeds(opml_path: Path) -> Iterable[Tuple[str, str, str]]:
 
     for group in body.findall("outline"):
         group_title = group.attrib.get("title") or group.attrib.get("text") or "General"
+        type_slug, type_label = normalize_category(group_title)
         for feed in group.findall("outline"):
             xml_url = feed.attrib.get("xmlUrl")
             if not xml_url:
                 continue
             feed_title = feed.attrib.get("title") or feed.attrib.get("text") or xml_url
-            yield group_title, feed_title, xml_url
+            yield type_slug, type_label, feed_title, xml_url
 
 # -------------------------------
 # Main
@@ -467,23 +574,20 @@ def main() -> None:
     # Incremental mode: reaproveita itens existentes
     if OUTPUT_PATH.exists():
         try:
-            existing_data = json.loads(OUTPUT_PATH.read_text(encoding="utf-8"))
+            existing_data = load_json(OUTPUT_PATH)
             existing_items = existing_data.get("items", [])
             kept_existing = 0
+            cutoff_ts = cutoff.timestamp()
 
             for item in existing_items:
                 link = item.get("link")
                 if not link:
                     continue
 
+                # Compara epoch direto, sem montar datetime por item
                 pub_ts = item.get("published_ts")
-                if pub_ts is not None:
-                    try:
-                        existing_dt = datetime.fromtimestamp(pub_ts, tz=timezone.utc)
-                        if existing_dt < cutoff:
-                            continue
-                    except Exception:
-                        pass
+                if isinstance(pub_ts, (int, float)) and pub_ts < cutoff_ts:
+                    continue
 
                 # Garante que itens antigos também tenham o campo "curated"
                 if "curated" not in item:
@@ -491,7 +595,7 @@ def main() -> None:
                     summary = (item.get("summary") or "")
                     text = f"{title} {summary}".lower()
                     item["curated"] = any(
-                        kw.lower() in text for kw in CURATED_KEYWORDS
+                        kw in text for kw in CURATED_KEYWORDS_LC
                     )
 
                 items_by_link[link] = item
@@ -505,91 +609,96 @@ def main() -> None:
     print(f"[INFO] Using OPML: {OPML_PATH}")
     print(f"[INFO] Collecting items from the last {DAYS_BACK} days (>= {cutoff.isoformat()})")
 
-    for group_title, feed_title, xml_url in iter_opml_feeds(OPML_PATH):
-        type_slug, type_label = normalize_category(group_title)
-        print(f"[INFO] Fetching feed: {feed_title} ({xml_url}) [{type_label}]")
+    feeds = list(iter_opml_feeds(OPML_PATH))
+    print(f"[INFO] Fetching {len(feeds)} feeds with {FETCH_WORKERS} workers")
+
+    # Downloads em paralelo; o processamento segue a ordem do OPML
+    # (executor.map preserva a ordem), então o resultado é determinístico.
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+        fetched = executor.map(fetch_feed, [xml_url for *_, xml_url in feeds])
+
+        for (type_slug, type_label, feed_title, xml_url), (parsed, fetch_error) in zip(feeds, fetched):
+            print(f"[INFO] Processing feed: {feed_title} ({xml_url}) [{type_label}]")
+
+            feed_key = xml_url or feed_title
+            if feed_key not in promo_stats:
+                promo_stats[feed_key] = {
+                    "feed_title": feed_title,
+                    "xml_url": xml_url,
+                    "type_label": type_label,
+                    "promo_count": 0,
+                    "examples": [],
+                }
 
-        feed_key = xml_url or feed_title
-        if feed_key not in promo_stats:
-            promo_stats[feed_key] = {
-                "feed_title": feed_title,
-                "xml_url": xml_url,
-                "type_label": type_label,
-                "promo_count": 0,
-                "examples": [],
-            }
+            feed_stat = promo_stats[feed_key]
 
-        feed_stat = promo_stats[feed_key]
+            if fetch_error is not None:
+                print(f"[WARN] Failed to fetch feed {feed_title} ({xml_url}): {fetch_error!r}")
+                continue
 
-        try:
-            parsed = feedparser.parse(xml_url)
-        except Exception as e:
-            print(f"[WARN] Failed to fetch feed {feed_title} ({xml_url}): {e!r}")
-            continue
+            if getattr(parsed, "bozo", False) and getattr(parsed, "bozo_exception", None):
+                print(
+                    f"[WARN] Bozo parsing feed {feed_title} ({xml_url}): "
+                    f"{parsed.bozo_exception!r}"
+                )
 
-        if getattr(parsed, "bozo", False) and getattr(parsed, "bozo_exception", None):
-            print(
-                f"[WARN] Bozo parsing feed {feed_title} ({xml_url}): "
-                f"{parsed.bozo_exception!r}"
-            )
+            for entry in parsed.entries:
+                # entries são FeedParserDict: .get evita o caminho de __getattr__
+                link = entry.get("link")
+                title = (entry.get("title") or "").strip()
+                summary_raw = entry.get("summary") or entry.get("description") or ""
 
-        for entry in parsed.entries:
-            link = getattr(entry, "link", None)
-            title = getattr(entry, "title", "").strip()
-            summary_raw = getattr(entry, "summary", "") or getattr(entry, "description", "")
+                if not link or not title:
+                    continue
 
-            if not link or not title:
-                continue
+                # Filtro PROMO super conservador
+                if is_promotional_entry(title, summary_raw):
+                    feed_stat["promo_count"] += 1
+                    if len(feed_stat["examples"]) < 10:
+                        feed_stat["examples"].append(title)
+                    continue
 
-            # Filtro PROMO super conservador
-            if is_promotional_entry(title, summary_raw):
-                feed_stat["promo_count"] += 1
-                if len(feed_stat["examples"]) < 10:
-                    feed_stat["examples"].append(title)
-                continue
+                pub_dt = parse_published(entry)
+                if not pub_dt:
+                    pub_iso = None
+                    pub_ts = None
+                else:
+                    if pub_dt < cutoff:
+                        continue
+                    pub_iso = pub_dt.isoformat()
+                    pub_ts = int(pub_dt.timestamp())
+
+                summary = clean_html_summary(summary_raw)
+                smart_groups = compute_smart_groups(title, summary)
+
+                # Item é "Curated" se o smart_group já tiver Curated
+                is_curated = "Curated" in smart_groups
+
+                item = {
+                    "title": title,
+                    "summary": summary,
+                    "link": link,
+                    "source": feed_title,
+                    "type": type_slug,
+                    "type_label": type_label,
+                    "published": pub_iso,
+                    "published_ts": pub_ts,
+                    "smart_groups": smart_groups,
+                    "curated": is_curated,
+                }
 
-            pub_dt = parse_published(entry)
-            if not pub_dt:
-                pub_iso = None
-                pub_ts = None
-            else:
-                if pub_dt < cutoff:
-                    continue
-                pub_iso = pub_dt.isoformat()
-                pub_ts = int(pub_dt.timestamp())
-
-            summary = clean_html_summary(summary_raw)
-            smart_groups = compute_smart_groups(title, summary)
-
-            # Item é "Curated" se o smart_group já tiver Curated
-            is_curated = "Curated" in smart_groups
-
-            item = {
-                "title": title,
-                "summary": summary,
-                "link": link,
-                "source": feed_title,
-                "type": type_slug,
-                "type_label": type_label,
-                "published": pub_iso,
-                "published_ts": pub_ts,
-                "smart_groups": smart_groups,
-                "curated": is_curated,
-            }
-
-            existing = items_by_link.get(link)
-            if existing is None:
-                items_by_link[link] = item
-            else:
-                if (item["published_ts"] or 0) > (existing.get("published_ts") or 0):
+                existing = items_by_link.get(link)
+                if existing is None:
                     items_by_link[link] = item
+                else:
+                    if (item["published_ts"] or 0) > (existing.get("published_ts") or 0):
+                        items_by_link[link] = item
 
-    # Converte para lista e ordena por data
-    items_list = list(items_by_link.values())
-    items_list.sort(
-        key=lambda x: x["published_ts"] if x["published_ts"] is not None else 0,
-        reverse=True,
-    )
+    # Converte para lista e ordena por data. Itens sem data ficam no fim
+    # (como antes); assim o sort usa itemgetter (C) em vez de um lambda.
+    items_list = [it for it in items_by_link.values() if it.get("published_ts") is not None]
+    items_list.sort(key=itemgetter("published_ts"), reverse=True)
+    items_list.extend(it for it in items_by_link.values() if it.get("published_ts") is None)
 
     OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
     out_data = {
@@ -598,7 +707,7 @@ def main() -> None:
         "total_items": len(items_list),
         "items": items_list,
     }
-    OUTPUT_PATH.write_text(json.dumps(out_data, indent=2), encoding="utf-8")
+    write_json(OUTPUT_PATH, out_data)
     print(f"[INFO] Wrote {len(items_list)} items to {OUTPUT_PATH}")
 
     # -------------------------------
@@ -639,8 +748,8 @@ def main() -> None:
             )
 
 
-    report_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
-    report_latest.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    write_json(report_path, report)
+    write_json(report_latest, report)
 
     print(f"[INFO] Wrote promo filter report to {report_path}")
     print(f"[INFO] Updated latest promo report alias at {report_latest}")
@@ -15,17 +15,45 @@ Fonte de dados:
 - data/news_recent.json
 """
 
+import hashlib
 import json
+import os
+import pickle
 import re
+from bisect import bisect_right
 from collections import Counter, defaultdict
 from datetime import datetime, timedelta, timezone
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, Iterable, List
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    import ahocorasick  # Opcional: varredura única dos dicionários literais
+except ImportError:  # pragma: no cover
+    ahocorasick = None
+
+try:
+    import orjson  # Opcional: parse/serialização JSON mais rápidos
+except ImportError:  # pragma: no cover
+    orjson = None
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 NEWS_RECENT_PATH = BASE_DIR / "data" / "news_recent.json"
 OUTPUT_PATH = BASE_DIR / "data" / "trends.json"
 
+# Cache das features por notícia entre execuções (fora do git, ver .gitignore)
+FEATURE_CACHE_PATH = BASE_DIR / "data" / ".trends_cache.pkl"
+
+# Campos da notícia que entram em extract_features (chave do cache)
+FEATURE_CACHE_FIELDS = (
+    "title", "summary", "source", "published", "date",
+    "smart_groups", "categories", "tags", "category",
+)
+
+# Processos para a extração por notícia (1 = sem pool)
+TRENDS_WORKERS = max(1, int(os.environ.get("TRENDS_WORKERS", os.cpu_count() or 1)))
+TRENDS_CHUNKSIZE = 256
+
 # Janelas usadas pelo front
 WINDOWS = {
     "24h": 1,
@@ -34,6 +62,10 @@ WINDOWS = {
     "90d": 90,
 }
 
+# Tamanho máximo dos rankings (keywords, vendors, CVEs) no trends.json.
+# O trend.html mostra top 15 / 10 / 20; o resto só pesava no arquivo.
+TOP_K = 200
+
 STOPWORDS = {
     # stopwords genéricas de linguagem
     "the", "and", "for", "with", "from", "this", "that", "have", "has",
@@ -57,6 +89,12 @@ KEYWORD_VENDOR_STOPWORDS = {
     # "kaspersky", "crowdstrike", etc. se começarem a poluir
 }
 
+# Tudo que o tokenize descarta por nome, num set só
+TOKEN_STOPWORDS = frozenset(STOPWORDS | KEYWORD_VENDOR_STOPWORDS)
+
+# Tokens com 4+ caracteres (tamanho mínimo pra pegar termos mais "ricos")
+TOKEN_RE = re.compile(r"[a-z0-9\-]{4,}")
+
 
 # Vendors simples (ajuste conforme necessário)
 VENDOR_KEYWORDS = {
@@ -485,41 +523,92 @@ THREAT_ACTOR_NAMES = [
     "GALACTIC OCELOT",
 ]
 
-def build_threat_actor_patterns() -> List[str]:
+# Mapa canônico: lowercase -> nome oficial
+CANONICAL_TA_MAP = {name.lower(): name for name in THREAT_ACTOR_NAMES}
+
+# Padrões genéricos (APTxx, TAxxx, UNCxxx, Storm-xxxx, FINxx, Threat Group-xxxx)
+# num único regex, para percorrer o texto uma vez só. O texto já chega em
+# minúsculas (normalize_text), então o padrão é minúsculo e sem IGNORECASE.
+GENERIC_THREAT_ACTOR_REGEX = re.compile(
+    r"\b(?:apt ?\d+|apt-c-\d+|ta\d+|unc\d+|storm-\d+|fin\d+|threat group-\d+)\b"
+)
+
+# Prefixos literais de cada alternativa do regex genérico: no autômato eles
+# marcam onde vale tentar GENERIC_THREAT_ACTOR_REGEX.match(text, pos)
+GENERIC_THREAT_ACTOR_PREFIXES = ("apt", "ta", "unc", "storm-", "fin", "threat group-")
+
+# Fallback sem pyahocorasick: nomes são literais, então basta testar os
+# trechos de 1..N palavras do texto num set (em vez de uma alternância gigante)
+WORD_RE = re.compile(r"\w+")
+MAX_ACTOR_WORDS = max(len(WORD_RE.findall(name)) for name in THREAT_ACTOR_NAMES)
+# Prescreen: primeira sequência \w de cada nome. Um trecho só pode ser nome
+# se começar por uma delas, então o resto do texto nem é fatiado.
+ACTOR_FIRST_WORDS = frozenset(WORD_RE.match(name.lower()).group(0) for name in THREAT_ACTOR_NAMES)
+
+# Ordem dos nomes na alternância do regex (desempate entre matches sobrepostos)
+THREAT_ACTOR_ORDER: Dict[str, int] = {}
+for _name in THREAT_ACTOR_NAMES:
+    THREAT_ACTOR_ORDER.setdefault(CANONICAL_TA_MAP[_name.lower()], len(THREAT_ACTOR_ORDER))
+
+
+def build_literal_hits() -> Tuple[Tuple[str, Tuple[Tuple[str, str], ...]], ...]:
     """
-    Constrói a lista de regexes para detecção de threat actors:
-    - padrões genéricos (APTxx, TAxxx, UNCxxx, Storm-xxxx, FINxx, Threat Group-xxxx)
-    - um padrão grande com todos os nomes conhecidos (THREAT_ACTOR_NAMES)
+    Achata VENDOR_KEYWORDS e TRENDING_TERMS numa tabela única, montada uma
+    vez no import: ((palavra minúscula, ((tipo, valor), ...)), ...), com tipo
+    "vendor" / "trend". Os scanners só percorrem a tupla.
     """
-    generic_patterns = [
-        r"\bAPT ?\d+\b",
-        r"\bAPT-C-\d+\b",
-        r"\bTA\d+\b",
-        r"\bUNC\d+\b",
-        r"\bStorm-\d+\b",
-        r"\bFIN\d+\b",
-        r"\bThreat Group-\d+\b",
-    ]
+    hits_by_word: Dict[str, Dict[Tuple[str, str], None]] = defaultdict(dict)
+    for vendor, patterns in VENDOR_KEYWORDS.items():
+        for pat in patterns:
+            hits_by_word[pat.lower()][("vendor", vendor)] = None
+    for key in TRENDING_TERMS:
+        hits_by_word[key.lower()][("trend", key)] = None
+    return tuple((word, tuple(hits)) for word, hits in hits_by_word.items())
 
-    unique_names = sorted(set(THREAT_ACTOR_NAMES))
-    alt = "|".join(re.escape(name) for name in unique_names)
-    name_pattern = rf"\b(?:{alt})\b"
 
-    return generic_patterns + [name_pattern]
+LITERAL_HITS = build_literal_hits()
 
 
-THREAT_ACTOR_PATTERNS = build_threat_actor_patterns()
+def build_keyword_automaton():
+    """
+    Monta um único autômato Aho-Corasick com todos os dicionários literais:
+    LITERAL_HITS (vendors / trends), THREAT_ACTOR_NAMES (em minúsculas) e os
+    prefixos de GENERIC_THREAT_ACTOR_PREFIXES.
+
+    O payload de cada palavra é (len(palavra), ((tipo, valor), ...)), com
+    tipo em "vendor" / "trend" / "actor" / "generic". Para actors o valor é
+    (nome canônico, ordem no regex, 1º char é \w?, último char é \w?), tudo
+    que o filtro de \b precisa sem olhar o nome de novo.
+    Retorna None se pyahocorasick não estiver instalado.
+    """
+    if ahocorasick is None:
+        return None
+
+    hits_by_word: Dict[str, Dict[Tuple[str, str], None]] = defaultdict(dict)
+    for word, hits in LITERAL_HITS:
+        hits_by_word[word].update(dict.fromkeys(hits))
+    for name_lc, canonical in CANONICAL_TA_MAP.items():
+        actor = (
+            canonical,
+            THREAT_ACTOR_ORDER[canonical],
+            WORD_RE.match(name_lc[0]) is not None,
+            WORD_RE.match(name_lc[-1]) is not None,
+        )
+        hits_by_word[name_lc][("actor", actor)] = None
+    for prefix in GENERIC_THREAT_ACTOR_PREFIXES:
+        hits_by_word[prefix][("generic", prefix)] = None
 
-# Mapa canônico: lowercase -> nome oficial
-CANONICAL_TA_MAP = {name.lower(): name for name in THREAT_ACTOR_NAMES}
+    automaton = ahocorasick.Automaton()
+    for word, hits in hits_by_word.items():
+        automaton.add_word(word, (len(word), tuple(hits)))
+    automaton.make_automaton()
+    return automaton
 
-# Regex único para extrair nomes de threat actors (sem padrões genéricos)
-THREAT_ACTOR_NAME_REGEX = re.compile(
-    r"\b(" + "|".join(re.escape(name) for name in THREAT_ACTOR_NAMES) + r")\b",
-    re.IGNORECASE,
-)
 
-CVE_REGEX = re.compile(r"\bCVE-\d{4}-\d{4,7}\b", re.IGNORECASE)
+KEYWORD_AUTOMATON = build_keyword_automaton()
+
+# Minúsculo e sem IGNORECASE pelo mesmo motivo; o ID sai com .upper()
+CVE_REGEX = re.compile(r"\bcve-\d{4}-\d{4,7}\b")
 
 
 # =========================================================
@@ -536,6 +625,10 @@ def parse_iso(date_str: str) -> datetime:
     if s.endswith("Z"):
         s = s[:-1] + "+00:00"
     dt = datetime.fromisoformat(s)
+    # caso comum (o build_news_json grava em UTC): já vem com timezone.utc,
+    # sem precisar do astimezone
+    if dt.tzinfo is timezone.utc:
+        return dt
     if dt.tzinfo is None:
         dt = dt.replace(tzinfo=timezone.utc)
     else:
@@ -554,8 +647,10 @@ def load_news() -> List[Dict[str, Any]]:
       { "entries": [ ... ] } ou "items"/"news"/"results"/"data"
     """
     print(f"[INFO] Loading {NEWS_RECENT_PATH}...")
-    raw = NEWS_RECENT_PATH.read_text(encoding="utf-8")
-    data = json.loads(raw)
+    if orjson is not None:
+        data = orjson.loads(NEWS_RECENT_PATH.read_bytes())
+    else:
+        data = json.loads(NEWS_RECENT_PATH.read_text(encoding="utf-8"))
 
     # Caso ideal: lista na raiz
     if isinstance(data, list):
@@ -590,39 +685,19 @@ def normalize_text(entry: Dict[str, Any]) -> str:
     return " ".join(parts).lower()
 
 
-def tokenize(text: str) -> Iterable[str]:
+def tokenize(text: str) -> List[str]:
     """
-    Divide o texto em tokens simples, removendo:
-    - stopwords
-    - tokens muito curtos
+    Divide o texto (já em minúsculas, ver normalize_text) em tokens simples,
+    removendo:
+    - tokens muito curtos (o {4,} do TOKEN_RE já cuida disso)
+    - stopwords, pedaços de URL e vendors que já aparecem em outro gráfico
     - números puros / anos (2024, 2025)
-    - pedaços de URL (http, https, www, com)
-    - alguns vendors que já aparecem em outro gráfico
     """
-    for token in re.findall(r"[a-zA-Z0-9\-]+", text.lower()):
-        # tamanho mínimo um pouco maior pra pegar termos mais "ricos"
-        if len(token) < 4:
-            continue
-
-        if token in STOPWORDS:
-            continue
-
-        # ignorar números e anos
-        if token.isdigit():
-            continue
-        if re.fullmatch(r"20\d{2}", token):
-            continue
-
-        # pedaços de URL (já cobertos em STOPWORDS, mas por garantia)
-        if token in ("http", "https", "www", "com"):
-            continue
-
-        # vendors que queremos ver só no gráfico de Vendors
-        if token in KEYWORD_VENDOR_STOPWORDS:
-            continue
-
-        yield token
-
+    return [
+        token
+        for token in TOKEN_RE.findall(text)
+        if token not in TOKEN_STOPWORDS and not token.isdigit()
+    ]
 
 
 def get_categories(entry: Dict[str, Any]) -> List[str]:
@@ -649,121 +724,325 @@ def get_categories(entry: Dict[str, Any]) -> List[str]:
     return cleaned
 
 
-def within_window(entry_dt: datetime, now: datetime, days: int) -> bool:
-    return entry_dt >= (now - timedelta(days=days))
+def _is_word_char(ch: str) -> bool:
+    # mesma definição de \w do módulo re (str / Unicode)
+    return ch.isalnum() or ch == "_"
 
 
-# =========================================================
-#  Main
-# =========================================================
+def select_actor_matches(candidates: List[Tuple[int, int, int, str]]) -> Iterable[str]:
+    """
+    Recebe matches (start, ordem_do_nome, end, canônico) e aplica a mesma
+    seleção de um finditer sobre a alternância dos nomes: match mais à
+    esquerda, primeiro nome da lista, sem sobreposição.
+    """
+    pos = 0
+    for start, _, end, canonical in sorted(candidates):
+        if start >= pos:
+            yield canonical
+            pos = end
 
-def main() -> None:
-    news = load_news()
-    now = datetime.now(timezone.utc)
 
-    # Contadores agregados
-    daily_counter = Counter()  # date_str -> total de notícias
-    per_window_categories: Dict[str, Counter] = {w: Counter() for w in WINDOWS}
-    per_window_keywords: Dict[str, Counter] = {w: Counter() for w in WINDOWS}
-    per_window_vendors: Dict[str, Counter] = {w: Counter() for w in WINDOWS}
-    per_window_trends: Dict[str, Counter] = {w: Counter() for w in WINDOWS}
-    per_window_cves: Dict[str, Counter] = {w: Counter() for w in WINDOWS}
+def scan_keywords(text: str) -> Tuple[Set[str], Set[str], Set[str], bool]:
+    """
+    Varre o texto (já em minúsculas) e devolve
+    (vendors, trend_keys, actors, has_actor).
 
-    # Threat actors
-    threat_actor_daily_counter = Counter()          # date_str -> qtd notícias com actor
-    threat_actor_daily_names: Dict[str, Counter] = defaultdict(Counter)  # date_str -> Counter(actor_name)
+    - vendors / trends: substring simples
+    - actors: nome canônico, respeitando \b nas duas pontas (como o regex)
+    - has_actor: algum nome conhecido ou padrão genérico (APTxx, TAxxx,
+      Storm-xxxx, etc.)
 
-    threat_actor_compiled = [
-        re.compile(pat, re.IGNORECASE) for pat in THREAT_ACTOR_PATTERNS
-    ]
+    Com pyahocorasick é uma passada só; sem ele, substring sobre LITERAL_HITS
+    + lookup dos trechos de palavras em CANONICAL_TA_MAP.
+    """
+    vendor_hits: Set[str] = set()
+    trend_hits: Set[str] = set()
+    actor_hits: Set[str] = set()
+
+    if KEYWORD_AUTOMATON is not None:
+        text_len = len(text)
+        candidates = []
+        generic_starts = []
+        # tipos em ordem de frequência: prefixos genéricos ("ta", "fin"...)
+        # são ~3/4 dos hits, depois vendors, trends e, raros, os nomes
+        for end_idx, (length, hits) in KEYWORD_AUTOMATON.iter(text):
+            for kind, value in hits:
+                if kind == "generic":
+                    generic_starts.append(end_idx - length + 1)
+                elif kind == "vendor":
+                    vendor_hits.add(value)
+                elif kind == "trend":
+                    trend_hits.add(value)
+                else:
+                    canonical, order, first_is_word, last_is_word = value
+                    start = end_idx - length + 1
+                    before = text[start - 1] if start > 0 else " "
+                    after = text[end_idx + 1] if end_idx + 1 < text_len else " "
+                    if (
+                        _is_word_char(before) != first_is_word
+                        and last_is_word != _is_word_char(after)
+                    ):
+                        candidates.append((start, order, end_idx + 1, canonical))
+
+        actor_hits.update(select_actor_matches(candidates))
+
+        # match() ancorado no início do prefixo: o \b do regex ainda olha o
+        # caractere anterior, então equivale ao search() no texto todo
+        has_actor = bool(actor_hits) or any(
+            GENERIC_THREAT_ACTOR_REGEX.match(text, pos) for pos in generic_starts
+        )
+        return vendor_hits, trend_hits, actor_hits, has_actor
+
+    # `in` do CPython já é uma busca em C; uma tabela achatada e já em
+    # minúsculas evita o .lower() por teste e o loop aninhado por vendor
+    for word, hits in LITERAL_HITS:
+        if word in text:
+            for kind, value in hits:
+                if kind == "vendor":
+                    vendor_hits.add(value)
+                else:
+                    trend_hits.add(value)
+
+    # Um match de \bnome\b sempre começa no início e termina no fim de uma
+    # sequência \w, então só esses trechos precisam ser testados.
+    spans = [(m.start(), m.end()) for m in WORD_RE.finditer(text)]
+    candidates = []
+    for i, (start, first_end) in enumerate(spans):
+        if text[start:first_end] not in ACTOR_FIRST_WORDS:
+            continue
+        for _, end in spans[i:i + MAX_ACTOR_WORDS]:
+            canonical = CANONICAL_TA_MAP.get(text[start:end])
+            if canonical is not None:
+                candidates.append((start, THREAT_ACTOR_ORDER[canonical], end, canonical))
 
-    processed = 0
-    skipped_no_date = 0
+    actor_hits.update(select_actor_matches(candidates))
 
-    for entry in news:
-        date_str = entry.get("published") or entry.get("date")
-        if not date_str:
-            skipped_no_date += 1
-            continue
+    has_actor = bool(actor_hits) or GENERIC_THREAT_ACTOR_REGEX.search(text) is not None
+    return vendor_hits, trend_hits, actor_hits, has_actor
 
-        try:
-            dt = parse_iso(date_str)
-        except Exception:
-            skipped_no_date += 1
-            continue
 
-        date_only = dt.date().isoformat()
-        text = normalize_text(entry)
+def extract_features(entry: Dict[str, Any], min_ts: float = float("-inf")) -> Optional[Tuple[Any, ...]]:
+    """
+    Extrai de uma notícia tudo que o main agrega:
+    (ts, date_only, has_actor, actor_names, cats, tokens, vendor_hits,
+    trend_hits, cve_hits).
 
-        # Volume diário
-        daily_counter[date_only] += 1
+    Notícias anteriores a min_ts (cutoff da janela mais larga) só entram nas
+    séries diárias: categorias, tokens e CVEs ficam vazios. Como o cutoff só
+    avança, uma notícia velha nunca volta a cair numa janela, e as features
+    reduzidas continuam válidas no cache.
 
-        # 1) Detecção genérica de threat actor (APTxx, TAxxx, Storm-xxxx, etc.)
-        has_actor = any(p.search(text) for p in threat_actor_compiled)
-        if has_actor:
-            threat_actor_daily_counter[date_only] += 1
+    Retorna None se a notícia não tiver data válida. Não depende de estado
+    global mutável, então pode rodar num pool de processos.
+    """
+    date_str = entry.get("published") or entry.get("date")
+    if not date_str:
+        return None
+
+    try:
+        dt = parse_iso(date_str)
+    except Exception:
+        return None
+
+    text = normalize_text(entry)
+
+    # Vendors, trending terms e threat actors (uma varredura; os actors contam
+    # nas séries diárias mesmo fora das janelas)
+    vendor_hits, trend_hits, actor_names, has_actor = scan_keywords(text)
+
+    ts = dt.timestamp()
+    if ts < min_ts:
+        return (ts, dt.date().isoformat(), has_actor, tuple(actor_names),
+                (), (), frozenset(), frozenset(), frozenset())
+
+    # CVEs: a maioria dos textos nem cita CVE; o `in` (memchr em C) evita
+    # rodar o regex à toa
+    cve_hits = {m.upper() for m in CVE_REGEX.findall(text)} if "cve-" in text else ()
+
+    # Tuplas / frozensets: imutáveis, sem sobra de alocação e mais enxutos
+    # no pickle do cache; o Counter.update itera direto sobre eles
+    return (
+        ts,
+        dt.date().isoformat(),
+        has_actor,
+        tuple(actor_names),
+        tuple(get_categories(entry)),
+        tuple(tokenize(text)),
+        frozenset(vendor_hits),
+        frozenset(trend_hits),
+        frozenset(cve_hits),
+    )
 
-        # 2) Extração de nomes concretos para top_actors
-        name_matches = set(m.group(0) for m in THREAT_ACTOR_NAME_REGEX.finditer(text))
-        for raw_name in name_matches:
-            canonical = CANONICAL_TA_MAP.get(raw_name.lower(), raw_name)
-            threat_actor_daily_names[date_only][canonical] += 1
 
-        # Categorias
-        cats = get_categories(entry)
+def merge_window_buckets(buckets: List[Counter], window_order: List[str]) -> Dict[str, Counter]:
+    """
+    buckets[k] tem as contagens das notícias que caem em exatamente as k
+    primeiras janelas de window_order (da mais larga para a mais estreita).
+    A janela i é então a soma dos buckets k > i: acumula do mais estreito
+    para o mais largo.
+    """
+    merged: Dict[str, Counter] = {}
+    acc: Counter = Counter()
+    for k in range(len(window_order), 0, -1):
+        if buckets[k]:
+            acc.update(buckets[k])
+        # a janela mais larga (k == 1) fica com o próprio acumulador
+        merged[window_order[k - 1]] = acc.copy() if k > 1 else acc
+    return merged
 
-        # Keywords
-        tokens = list(tokenize(text))
 
-        # Vendors
-        vendor_hits = set()
-        for vendor, patterns in VENDOR_KEYWORDS.items():
-            for pat in patterns:
-                if pat.lower() in text:
-                    vendor_hits.add(vendor)
-                    break
+def feature_cache_key(entry: Dict[str, Any]) -> str:
+    raw = repr(tuple(entry.get(f) for f in FEATURE_CACHE_FIELDS))
+    return hashlib.blake2b(raw.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
 
-        # Trending terms
-        trend_hits = set()
-        for key, label in TRENDING_TERMS.items():
-            if key.lower() in text:
-                trend_hits.add(key)
 
-        # CVEs
-        cve_hits = set(m.upper() for m in CVE_REGEX.findall(text))
+def feature_cache_signature() -> str:
+    """
+    Assinatura do código que gerou o cache: qualquer mudança no script
+    (dicionários, tokenize, regras) invalida as features salvas.
+    """
+    return hashlib.blake2b(Path(__file__).read_bytes(), digest_size=16).hexdigest()
 
-        # Aplicar em cada janela
-        for win, days in WINDOWS.items():
-            if not within_window(dt, now, days):
-                continue
 
-            for c in cats:
-                per_window_categories[win][c] += 1
+def load_feature_cache(signature: str) -> Dict[str, Any]:
+    try:
+        with FEATURE_CACHE_PATH.open("rb") as f:
+            saved_signature, features = pickle.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"[WARN] Ignoring unreadable cache {FEATURE_CACHE_PATH}: {e}")
+        return {}
+    return features if saved_signature == signature else {}
 
-            for t in tokens:
-                per_window_keywords[win][t] += 1
 
-            for v in vendor_hits:
-                per_window_vendors[win][v] += 1
+def save_feature_cache(signature: str, features: Dict[str, Any]) -> None:
+    tmp_path = FEATURE_CACHE_PATH.with_name(FEATURE_CACHE_PATH.name + ".tmp")
+    try:
+        with tmp_path.open("wb") as f:
+            pickle.dump((signature, features), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, FEATURE_CACHE_PATH)
+    except OSError as e:
+        print(f"[WARN] Could not write cache {FEATURE_CACHE_PATH}: {e}")
 
-            for key in trend_hits:
-                per_window_trends[win][key] += 1
 
-            for cve in cve_hits:
-                per_window_cves[win][cve] += 1
+# =========================================================
+#  Main
+# =========================================================
+
+def main() -> None:
+    news = load_news()
+    now = datetime.now(timezone.utc)
+
+    # Contadores agregados
+    daily_counter = Counter()  # date_str -> total de notícias
+
+    # Threat actors
+    threat_actor_daily_counter = Counter()          # date_str -> qtd notícias com actor
+    threat_actor_daily_names: Dict[str, Counter] = defaultdict(Counter)  # date_str -> Counter(actor_name)
 
-        processed += 1
+    # Janelas são aninhadas (24h ⊂ 7d ⊂ 30d ⊂ 90d): ordenando da mais larga
+    # para a mais estreita, as janelas de uma notícia são um prefixo da lista,
+    # achado com um bisect sobre os cutoffs (em ordem crescente).
+    window_order = sorted(WINDOWS, key=WINDOWS.get, reverse=True)
+    # Cutoffs e datas das notícias como unix timestamps: comparação de float
+    # em C no bisect, em vez de datetime.__ge__
+    window_cutoffs = [(now - timedelta(days=WINDOWS[win])).timestamp() for win in window_order]
+
+    # Contadores por janela: cada notícia é contada uma vez só, no bucket do
+    # número de janelas que a contêm; as janelas saem da soma dos buckets no
+    # final (merge_window_buckets).
+    n_buckets = len(window_order) + 1
+    category_buckets = [Counter() for _ in range(n_buckets)]
+    keyword_buckets = [Counter() for _ in range(n_buckets)]
+    vendor_buckets = [Counter() for _ in range(n_buckets)]
+    trend_buckets = [Counter() for _ in range(n_buckets)]
+    cve_buckets = [Counter() for _ in range(n_buckets)]
+
+    # Features dependem só do conteúdo da notícia: as de execuções anteriores
+    # vêm do cache e só as notícias novas passam por extract_features.
+    signature = feature_cache_signature()
+    cached = load_feature_cache(signature)
+    keys = [feature_cache_key(entry) for entry in news]
+    missing = {key: entry for key, entry in zip(keys, news) if key not in cached}
+    print(f"[INFO] Feature cache: {len(missing)} of {len(keys)} entries to extract")
+
+    # A extração é independente por notícia; com mais de um core ela roda
+    # num pool (map preserva a ordem) e só a agregação fica aqui.
+    extract = partial(extract_features, min_ts=window_cutoffs[0])
+    if TRENDS_WORKERS > 1 and len(missing) > TRENDS_CHUNKSIZE:
+        # import local: concurrent.futures.process + multiprocessing são a maior
+        # parte do tempo de import do script e só servem quando o pool roda
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # fork (onde existe) herda do processo pai os regexes e o autômato já
+        # montados no import; com spawn/forkserver cada worker reimporta o
+        # módulo e remonta tudo uma vez
+        mp_context = (
+            multiprocessing.get_context("fork")
+            if "fork" in multiprocessing.get_all_start_methods()
+            else None
+        )
+        with ProcessPoolExecutor(max_workers=TRENDS_WORKERS, mp_context=mp_context) as executor:
+            extracted = list(executor.map(
+                extract, missing.values(), chunksize=TRENDS_CHUNKSIZE
+            ))
+    else:
+        extracted = [extract(entry) for entry in missing.values()]
+    cached.update(zip(missing, extracted))
+
+    # Só as notícias atuais ficam no cache (as que saíram do news_recent caem fora)
+    cache = {key: cached[key] for key in keys}
+    # Nada extraído e nada podado: o arquivo em disco já é esse cache
+    if missing or len(cache) != len(cached):
+        save_feature_cache(signature, cache)
+
+    dated = [cache[key] for key in keys if cache[key] is not None]
+    processed = len(dated)
+    skipped_no_date = len(keys) - processed
+
+    # Volume diário e notícias com threat actor: um Counter.update cada
+    # (feat[1] = date_only, feat[2] = has_actor)
+    daily_counter.update(feat[1] for feat in dated)
+    threat_actor_daily_counter.update(feat[1] for feat in dated if feat[2])
+
+    for (ts, date_only, _, actor_names, cats, tokens,
+         vendor_hits, trend_hits, cve_hits) in dated:
+        # Nomes concretos para top_actors
+        if actor_names:
+            threat_actor_daily_names[date_only].update(actor_names)
+
+        # Aplicar em cada janela
+        n_windows = bisect_right(window_cutoffs, ts)
+        if n_windows:
+            category_buckets[n_windows].update(cats)
+            keyword_buckets[n_windows].update(tokens)
+            vendor_buckets[n_windows].update(vendor_hits)
+            trend_buckets[n_windows].update(trend_hits)
+            cve_buckets[n_windows].update(cve_hits)
 
     print(f"[INFO] Processed entries: {processed}, skipped (no date): {skipped_no_date}")
 
+    per_window_categories = merge_window_buckets(category_buckets, window_order)
+    per_window_keywords = merge_window_buckets(keyword_buckets, window_order)
+    per_window_vendors = merge_window_buckets(vendor_buckets, window_order)
+    per_window_trends = merge_window_buckets(trend_buckets, window_order)
+    per_window_cves = merge_window_buckets(cve_buckets, window_order)
+
+    # Um sort só: toda notícia com actor também entra no daily_counter, então
+    # as datas do timeline de actors já estão em all_dates
+    all_dates = sorted(daily_counter)
+
     # daily_volume ordenado
     daily_volume = [
         {"date": d, "count": int(daily_counter[d])}
-        for d in sorted(daily_counter.keys())
+        for d in all_dates
     ]
 
     def counter_to_sorted_list(cnt: Counter) -> List[List[Any]]:
-        return [[k, int(v)] for k, v in cnt.most_common()]
+        # most_common(n) usa heapq.nlargest: O(V log K) em vez de ordenar tudo
+        return [[k, int(v)] for k, v in cnt.most_common(TOP_K)]
 
     categories_out = {
         win: {k: int(v) for k, v in per_window_categories[win].most_common()}
@@ -797,7 +1076,9 @@ def main() -> None:
 
     # Threat actor timeline com top_actors para tooltip
     threat_actor_daily = []
-    for d in sorted(threat_actor_daily_counter.keys()):
+    for d in all_dates:
+        if d not in threat_actor_daily_counter:
+            continue
         total = int(threat_actor_daily_counter[d])
         names_counter = threat_actor_daily_names.get(d, Counter())
         top_names = [[name, int(cnt)] for name, cnt in names_counter.most_common(5)]
@@ -810,6 +1091,7 @@ def main() -> None:
     output = {
         "generated_at": now.isoformat(),
         "windows": list(WINDOWS.keys()),
+        "top_k": TOP_K,
         "daily_volume": daily_volume,
         "categories": categories_out,
         "top_keywords": top_keywords_out,
@@ -820,7 +1102,10 @@ def main() -> None:
     }
 
     OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-    OUTPUT_PATH.write_text(json.dumps(output, ensure_ascii=False, indent=2), encoding="utf-8")
+    if orjson is not None:
+        OUTPUT_PATH.write_bytes(orjson.dumps(output, option=orjson.OPT_INDENT_2))
+    else:
+        OUTPUT_PATH.write_text(json.dumps(output, ensure_ascii=False, indent=2), encoding="utf-8")
     print(f"[OK] Trends written to {OUTPUT_PATH}")
 
 